@@ -1,9 +1,13 @@
-import logging, os, time, datetime, pytz, requests
+import logging, os, time, requests
+from concurrent.futures import ThreadPoolExecutor
 from functools import wraps
 
+_SEOUL_OFFSET = 9 * 3600  # KST = UTC+9, 서머타임 없음
+
+
 def seoul_time(timestamp):
-    dt = datetime.datetime.fromtimestamp(timestamp, pytz.timezone('Asia/Seoul'))
-    return dt.timetuple()
+    return time.gmtime(timestamp + _SEOUL_OFFSET)
+
 class loggerConfig:
     def __init__(self, logger_name:str, log_dir:str, log_type='file', is_print:bool=False) -> None:
         os.makedirs(log_dir, exist_ok=True)
@@ -78,17 +82,28 @@ def timeit(func):
 
 
 
-def send_telegram_message(bot_token, chat_id, message):
-    url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
-    payload = {
-        "chat_id": chat_id,
-        "text": message
-    }
+# 텔레그램 전송은 학습 루프를 막지 않도록 백그라운드 스레드 하나에서 처리 (Session 으로 연결 재사용)
+_TG_SESSION = requests.Session()
+_TG_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="telegram")
+
+
+def _telegram_done(future):
     try:
-        response = requests.post(url, data=payload)
+        response = future.result()
         if response.status_code == 200:
             print("메시지 전송 성공!")
         else:
             print(f"에러 발생: {response.status_code}, {response.text}")
     except Exception as e:
-        print(f"요청 중 에러 발생: {e}")
\ No newline at end of file
+        print(f"요청 중 에러 발생: {e}")
+
+
+def send_telegram_message(bot_token, chat_id, message):
+    url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
+    payload = {
+        "chat_id": chat_id,
+        "text": message
+    }
+    future = _TG_EXECUTOR.submit(_TG_SESSION.post, url, data=payload, timeout=5)
+    future.add_done_callback(_telegram_done)
+    return future
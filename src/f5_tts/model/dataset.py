@@ -1,13 +1,16 @@
-import json, sys, re, unicodedata
+import bisect, copy, csv, json, os, sys, re, hashlib, math
+from concurrent.futures import ThreadPoolExecutor
 from importlib.resources import files
 from pathlib import Path
 
+import numpy as np
+import soundfile as sf
 import torch
-import torch.nn.functional as F
 import torchaudio
 from datasets import Dataset as Dataset_
 from datasets import load_from_disk
 from torch import nn
+from torch.nn.utils.rnn import pad_sequence
 from torch.utils.data import Dataset, Sampler, ConcatDataset
 from tqdm import tqdm
 from typing import List, Union
@@ -16,6 +19,35 @@ from f5_tts.model.modules import MelSpec
 from f5_tts.model.utils import default
 from f5_tts.logger import loggerConfig
 
+try:
+    import julius
+except ImportError:
+    julius = None
+
+
+def get_resampler(
+    resamplers: dict, source_sample_rate: int, target_sample_rate: int, backend: str = "torchaudio"
+) -> nn.Module:
+    """
+    Return the cached resampler for source_sample_rate -> target_sample_rate, building it on first use.
+    backend     - "torchaudio" (default, same features existing checkpoints were trained on)
+                - "julius" for julius.ResampleFrac with gcd reduced rates (pip install f5-tts[julius]),
+                  faster but not bit-identical, so keep one backend per training run
+    """
+    resampler = resamplers.get(source_sample_rate)
+    if resampler is None:
+        if backend == "julius":
+            if julius is None:
+                raise ImportError("resample_backend='julius' requires julius, install it with `pip install julius`")
+            g = math.gcd(source_sample_rate, target_sample_rate)
+            resampler = julius.ResampleFrac(source_sample_rate // g, target_sample_rate // g)
+        elif backend == "torchaudio":
+            resampler = torchaudio.transforms.Resample(source_sample_rate, target_sample_rate)
+        else:
+            raise ValueError(f"Unknown resample backend: {backend}")
+        resamplers[source_sample_rate] = resampler
+    return resampler
+
 
 class HFDataset(Dataset):
     def __init__(
@@ -27,10 +59,13 @@ class HFDataset(Dataset):
         n_fft=1024,
         win_length=1024,
         mel_spec_type="vocos",
+        resample_backend="torchaudio",
     ):
         self.data = hf_dataset
         self.target_sample_rate = target_sample_rate
         self.hop_length = hop_length
+        self.resample_backend = resample_backend
+        self._resamplers = {}  # source_sample_rate -> resampler, so the sinc kernel is built once per rate
 
         self.mel_spectrogram = MelSpec(
             n_fft=n_fft,
@@ -50,6 +85,9 @@ class HFDataset(Dataset):
     def __len__(self):
         return len(self.data)
 
+    def _resample(self, wav, source_sample_rate):
+        return get_resampler(self._resamplers, source_sample_rate, self.target_sample_rate, self.resample_backend)(wav)
+
     def __getitem__(self, index):
         row = self.data[index]
         audio = row["audio"]["array"]
@@ -65,8 +103,7 @@ class HFDataset(Dataset):
         audio_tensor = torch.from_numpy(audio).float()
 
         if sample_rate != self.target_sample_rate:
-            resampler = torchaudio.transforms.Resample(sample_rate, self.target_sample_rate)
-            audio_tensor = resampler(audio_tensor)
+            audio_tensor = self._resample(audio_tensor, sample_rate)
 
         audio_tensor = audio_tensor.unsqueeze(0)  # 't -> 1 t')
 
@@ -94,29 +131,33 @@ class CustomDataset(Dataset):
         win_length=1024,
         mel_spec_type="vocos",
         preprocessed_mel=False,
-        mel_spec_module: nn.Module | None = None,
+        mel_cache_dir: str | None = None,
+        resample_backend="torchaudio",
     ):
         self.data = custom_dataset
         self.durations = durations
         self.target_sample_rate = target_sample_rate
         self.hop_length = hop_length
+        self.n_mel_channels = n_mel_channels
         self.n_fft = n_fft
         self.win_length = win_length
         self.mel_spec_type = mel_spec_type
-        self.preprocessed_mel = preprocessed_mel
-
-        if not preprocessed_mel:
-            self.mel_spectrogram = default(
-                mel_spec_module,
-                MelSpec(
-                    n_fft=n_fft,
-                    hop_length=hop_length,
-                    win_length=win_length,
-                    n_mel_channels=n_mel_channels,
-                    target_sample_rate=target_sample_rate,
-                    mel_spec_type=mel_spec_type,
-                ),
-            )
+        self.resample_backend = resample_backend
+        self.preprocessed_mel = preprocessed_mel or mel_cache_dir is not None
+
+        # mels precomputed by cache_mel_memmap, frames of sample i are memmap[offsets[i]:offsets[i + 1]]
+        self.mel_cache_dir = mel_cache_dir
+        self.mel_offsets = np.load(Path(mel_cache_dir) / "offsets.npy") if mel_cache_dir is not None else None
+        self._mel_memmap = None  # opened lazily, so that each dataloader worker maps the file itself
+        self._resamplers = {}  # source_sample_rate -> resampler, so the sinc kernel is built once per rate
+        self.has_text_ids = "text_ids" in custom_dataset.column_names  # pre-tokenized by load_from_phonemize_txt
+
+        # frame length of every sample at once, for DynamicBatchSampler
+        self.frame_lens = (
+            np.asarray(durations if durations is not None else custom_dataset["duration"], dtype=np.float64)
+            * target_sample_rate
+            / hop_length
+        )
 
     def get_frame_len(self, index):
         if (
@@ -128,6 +169,33 @@ class CustomDataset(Dataset):
     def __len__(self):
         return len(self.data)
 
+    @property
+    def mel_memmap(self):
+        if self._mel_memmap is None:
+            self._mel_memmap = np.memmap(
+                Path(self.mel_cache_dir) / "mel.bin",
+                dtype=np.float16,
+                mode="r",
+                shape=(int(self.mel_offsets[-1]), self.n_mel_channels),
+            )
+        return self._mel_memmap
+
+    def _resample(self, wav, source_sample_rate):
+        return get_resampler(self._resamplers, source_sample_rate, self.target_sample_rate, self.resample_backend)(wav)
+
+    def load_audio(self, audio_path):
+        audio, source_sample_rate = torchaudio.load(audio_path)
+
+        # make sure mono input
+        if audio.shape[0] > 1:
+            audio = torch.mean(audio, dim=0, keepdim=True)
+
+        # resample if necessary
+        if source_sample_rate != self.target_sample_rate:
+            audio = self._resample(audio, source_sample_rate)
+
+        return audio
+
     def __getitem__(self, index):
         while True:
             row = self.data[index]
@@ -141,43 +209,49 @@ class CustomDataset(Dataset):
 
             index = (index + 1) % len(self.data)
 
-        if self.preprocessed_mel:
-            mel_spec = torch.tensor(row["mel_spec"])
+        item = {"text": text}
+        if self.has_text_ids:
+            item["text_ids"] = row["text_ids"]
+
+        if not self.preprocessed_mel:
+            # raw wave, mel is computed batched on device by the trainer, see collate_fn
+            audio = self.load_audio(audio_path)
+            item["wav"] = audio.squeeze(0)  # '1 nw -> nw'
+            return item
+
+        if self.mel_cache_dir is not None:
+            start, end = self.mel_offsets[index], self.mel_offsets[index + 1]
+            # kept float16 through collate and host to device copy, the trainer casts it on device
+            # copied out of the read-only mapping here (one copy either way, collate would make it otherwise)
+            mel_spec = torch.from_numpy(np.array(self.mel_memmap[start:end])).T  # 't d -> d t'
         else:
-            audio, source_sample_rate = torchaudio.load(audio_path)
-
-            # make sure mono input
-            if audio.shape[0] > 1:
-                audio = torch.mean(audio, dim=0, keepdim=True)
-
-            # resample if necessary
-            if source_sample_rate != self.target_sample_rate:
-                resampler = torchaudio.transforms.Resample(source_sample_rate, self.target_sample_rate)
-                audio = resampler(audio)
-
-            # to mel spectrogram
-            mel_spec = self.mel_spectrogram(audio)
-            mel_spec = mel_spec.squeeze(0)  # '1 d t -> d t'
+            mel_spec = row["mel_spec"]
+            if isinstance(mel_spec, np.ndarray) and mel_spec.dtype != object:
+                # shares memory for float32, columns stored as double (python floats) are cast like torch.tensor did
+                mel_spec = torch.from_numpy(mel_spec).float()
+            else:
+                mel_spec = torch.as_tensor(mel_spec, dtype=torch.float32)
 
-        return {
-            "mel_spec": mel_spec,
-            "text": text,
-        }
+        item["mel_spec"] = mel_spec
+        return item
 
 class CustomConcatDataset(ConcatDataset):
+    def __init__(self, datasets):
+        super().__init__(datasets)
+        # one contiguous array across all sub-datasets, so the sampler gathers frame lengths in a single indexing op
+        if all(hasattr(dataset, "frame_lens") for dataset in self.datasets):
+            self.frame_lens = np.concatenate([dataset.frame_lens for dataset in self.datasets])
+
     def get_frame_len(self, idx):
         dataset_idx, sample_idx = self._get_dataset_and_sample_index(idx)
         return self.datasets[dataset_idx].get_frame_len(sample_idx)
 
     def _get_dataset_and_sample_index(self, idx):
-        for i, cumsum in enumerate(self.cumulative_sizes):
-            if idx < cumsum:
-                if i == 0:
-                    sample_idx = idx
-                else:
-                    sample_idx = idx - self.cumulative_sizes[i - 1]
-                return i, sample_idx
-        raise IndexError("Index out of range")
+        i = bisect.bisect_right(self.cumulative_sizes, idx)
+        if i == len(self.cumulative_sizes):
+            raise IndexError("Index out of range")
+        sample_idx = idx - self.cumulative_sizes[i - 1] if i > 0 else idx
+        return i, sample_idx
 
 # Dynamic Batch Sampler
 class DynamicBatchSampler(Sampler[list[int]]):
@@ -199,14 +273,18 @@ class DynamicBatchSampler(Sampler[list[int]]):
         self.epoch = 0
         self.logger = logger
 
-        indices, batches = [], []
+        batches = []
         data_source = self.sampler.data_source
 
         if self.logger:
             self.logger.add_info("DynamicBatchSampler", "Sorting with sampler... if slow, check whether dataset is provided with duration")
-        for idx in self.sampler:
-            indices.append((idx, data_source.get_frame_len(idx)))
-        indices.sort(key=lambda elem: elem[1])
+        indices = np.fromiter(self.sampler, dtype=np.int64)
+        if hasattr(data_source, "frame_lens"):
+            frame_lens = data_source.frame_lens[indices]
+        else:
+            frame_lens = np.array([data_source.get_frame_len(idx) for idx in indices], dtype=np.float64)
+        order = np.argsort(frame_lens, kind="stable")  # stable, same order as the former list.sort by frame_len
+        indices = zip(indices[order].tolist(), frame_lens[order].tolist())
 
         batch = []
         batch_frames = 0
@@ -264,7 +342,6 @@ def load_dataset(
     tokenizer: str = "pinyin",
     dataset_type: str = "CustomDataset",
     audio_type: str = "raw",
-    mel_spec_module: nn.Module | None = None,
     mel_spec_kwargs: dict = dict(),
 ) -> CustomDataset | HFDataset:
     """
@@ -283,7 +360,10 @@ def load_dataset(
                 train_dataset = Dataset_.from_file(f"{rel_data_path}/raw.arrow")
             preprocessed_mel = False
         elif audio_type == "mel":
-            train_dataset = Dataset_.from_file(f"{rel_data_path}/mel.arrow")
+            # decode mel_spec from arrow straight to ndarray, other columns stay python objects
+            train_dataset = Dataset_.from_file(f"{rel_data_path}/mel.arrow").with_format(
+                "numpy", columns=["mel_spec"], output_all_columns=True
+            )
             preprocessed_mel = True
         with open(f"{rel_data_path}/duration.json", "r", encoding="utf-8") as f:
             data_dict = json.load(f)
@@ -292,7 +372,6 @@ def load_dataset(
             train_dataset,
             durations=durations,
             preprocessed_mel=preprocessed_mel,
-            mel_spec_module=mel_spec_module,
             **mel_spec_kwargs,
         )
 
@@ -321,93 +400,222 @@ def load_dataset(
 
     return train_dataset
 
+# transcript normalization tables, built once at import instead of per line
+# Zs (space separator) code points, these are stable across unicode versions
+_SPACE_SEPARATORS = "\u00a0\u1680\u2000\u2001\u2002\u2003\u2004\u2005\u2006\u2007\u2008\u2009\u200a\u202f\u205f\u3000"
+_WS_TABLE = str.maketrans({ch: " " for ch in _SPACE_SEPARATORS + "\t"})
+_DELETE_TABLE = str.maketrans("", "", "()[]{}<>")
+_MULTI_SPACE_RE = re.compile(r" {2,}")
+
+
 def load_from_phonemize_txt(meta_path:str, wav_dir:str, logger: loggerConfig = None, vocab_map: dict = None) -> Dataset_:
     data = []
+    candidates = []
     meta_path = Path(meta_path)
     wav_dir = Path(wav_dir)
-    WS_MAP = {              # ord(codepoint) → ' '
-        ord('\u00A0'): ' ',   # NBSP
-        ord('\u3000'): ' ',   # IDEOGRAPHIC SPACE
-        ord('\t')    : ' '    # Horizontal TAB
-    }
-    DELETE_CHARS = '()[]{}<>'
+    vocab_set = frozenset(vocab_map) if vocab_map is not None else None
 
     with open(meta_path, "r", encoding="utf-8", errors='ignore') as f:
         if logger:
             logger.add_info("load_from_phoenmize_txt", f'Parsing {meta_path.name}')
-        for line in f:
-            line = line.strip()
-            if not line or "|" not in line:
+        # C-level line split on "|"; quotes are part of the transcript, not csv quoting
+        for row in csv.reader(f, delimiter="|", quoting=csv.QUOTE_NONE):
+            if len(row) < 2:  # empty line or no "|"
                 continue
-            
-            try:
-                file_name, text, speaker, emotion, lang = line.split("|")
-                text = text.translate({ord('\u00A0'): ' ', ord('\u3000'): ' ', ord('\t'): ' '})
-                text = ''.join(' ' if unicodedata.category(c) == 'Zs' else c for c in text)
-                text = re.sub(r' {2,}', ' ', text).strip()
-                # 양쪽에 모두 " 가 있으면 제거
-                if len(text) >= 2 and text[0] == '"' and text[-1] == '"':
-                    text = text[1:-1].strip()
-                    
-                text = text.translate(str.maketrans('', '', DELETE_CHARS))
-                text.strip()
-            except ValueError:
-                print(f"[WARN] Skipping malformed line: {line}")
+            if len(row) != 5:
+                print(f"[WARN] Skipping malformed line: {'|'.join(row).strip()}")
                 continue
 
+            file_name, text, speaker, emotion, lang = row
+            file_name, lang = file_name.lstrip(), lang.rstrip()  # former line.strip()
+            text = text.translate(_WS_TABLE)  # tab and every Zs space → ' '
+            text = _MULTI_SPACE_RE.sub(' ', text).strip()
+            # 양쪽에 모두 " 가 있으면 제거
+            if len(text) >= 2 and text[0] == '"' and text[-1] == '"':
+                text = text[1:-1].strip()
+
+            text = text.translate(_DELETE_TABLE)
+
             wav_path = wav_dir / file_name
             if not wav_path.exists():
                 # print(f"[WARN] Missing wav file: {wav_path}")
                 continue
 
-            
-            duration = torchaudio.info(str(wav_path)).num_frames / torchaudio.info(str(wav_path)).sample_rate
+            candidates.append((wav_path, file_name, text, speaker, emotion, lang))
 
-            try:
-                info = torchaudio.info(str(wav_path))
-                duration = info.num_frames / info.sample_rate
-                if duration <= 1 or duration > 30:  # 너무 짧은 음성은 스킵
-                    # print(f"[WARN] duration is to long: {wav_path}")
-                    continue
-                # if len(text) > 256:
-                #     print(f"[WARN] text is to long: {wav_path}")
-                #     continue
-            except Exception as e:
-                print(f"[ERROR] torchaudio.info failed on {wav_path}: {e}")
-                continue
-            
-            if not text.strip():
-                print(f"[WARN] Empty text for {file_name}, skipping")
-                continue
-            
-            if vocab_map is not None:
-                # (idx, ch) 튜플 리스트로 수집 → 미등록만 필터링
-                unknown = [(i, ch) for i, ch in enumerate(text) if ch not in vocab_map]
-
-                if unknown:
-                    # 사람이 읽기 쉽게 "문자(위치)" 형태로 포맷
-                    repr_unknown = ", ".join([f"'{ch}'(pos {i})" for i, ch in unknown])
-                    # continue
-                    raise ValueError(
-                        f"[ERROR] 발견된 unknown token(s): [{repr_unknown}]\n"
-                        f"파일: {file_name}\n"
-                        f"문장: {text}\n"
-                        "vocab.txt 를 갱신하거나 데이터에서 해당 문자를 제거하세요."
-                    )
-                    
-            data.append({
-                "audio_path": str(wav_path),
-                "text": text,
-                "speaker": speaker,
-                "emotion": emotion,
-                "lang": lang,
-                "duration": duration
-            })
+    # header reads are I/O bound, overlap them in threads (one header read per file)
+    def probe(wav_path):
+        try:
+            if wav_path.suffix.lower() == ".wav":  # libsndfile directly, no torchaudio backend dispatch
+                with sf.SoundFile(str(wav_path)) as audio_file:
+                    return audio_file.frames / audio_file.samplerate
+            info = torchaudio.info(str(wav_path))
+            return info.num_frames / info.sample_rate
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers=(os.cpu_count() or 1) * 4) as executor:
+        durations = list(
+            tqdm(
+                executor.map(probe, [candidate[0] for candidate in candidates]),
+                total=len(candidates),
+                desc=f"Probing {meta_path.name}",
+            )
+        )
+
+    for (wav_path, file_name, text, speaker, emotion, lang), duration in zip(candidates, durations):
+        if isinstance(duration, Exception):
+            print(f"[ERROR] reading audio info failed on {wav_path}: {duration}")
+            continue
+
+        if duration <= 1 or duration > 30:  # 너무 짧은 음성은 스킵
+            # print(f"[WARN] duration is to long: {wav_path}")
+            continue
+        # if len(text) > 256:
+        #     print(f"[WARN] text is to long: {wav_path}")
+        #     continue
+
+        if not text.strip():
+            print(f"[WARN] Empty text for {file_name}, skipping")
+            continue
+        
+        # issuperset 으로 먼저 검사, 실패한 경우에만 (idx, ch) 튜플 리스트로 수집 → 미등록만 필터링
+        if vocab_set is not None and not vocab_set.issuperset(text):
+            unknown = [(i, ch) for i, ch in enumerate(text) if ch not in vocab_set]
+
+            # 사람이 읽기 쉽게 "문자(위치)" 형태로 포맷
+            repr_unknown = ", ".join([f"'{ch}'(pos {i})" for i, ch in unknown])
+            # continue
+            raise ValueError(
+                f"[ERROR] 발견된 unknown token(s): [{repr_unknown}]\n"
+                f"파일: {file_name}\n"
+                f"문장: {text}\n"
+                "vocab.txt 를 갱신하거나 데이터에서 해당 문자를 제거하세요."
+            )
+
+        record = {
+            "audio_path": str(wav_path),
+            "text": text,
+            "speaker": speaker,
+            "emotion": emotion,
+            "lang": lang,
+            "duration": duration
+        }
+        if vocab_map is not None:
+            # tokenize once here instead of every train step, every char is known after the check above
+            record["text_ids"] = np.fromiter((vocab_map[ch] for ch in text), dtype=np.int32, count=len(text))
+        data.append(record)
 
     if len(data) == 0:
         raise ValueError(f"[ERROR] No valid data parsed from {meta_path}")
     
-    return Dataset_.from_list(data)
+    dataset = Dataset_.from_list(data)
+    if vocab_map is not None:
+        # text_ids come back as int32 ndarray instead of a python list of ints
+        dataset = dataset.with_format("numpy", columns=["text_ids"], output_all_columns=True)
+    return dataset
+
+def _mel_cache_manifest(dataset: CustomDataset, audio_paths: list[str]) -> dict:
+    # everything the cached frames depend on: mel params + every audio file (path, size, mtime)
+    audio_hash = hashlib.md5()
+    for path in audio_paths:
+        stat = os.stat(path)
+        audio_hash.update(f"{path}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode())
+    return {
+        "mel_spec_type": dataset.mel_spec_type,
+        "n_fft": dataset.n_fft,
+        "hop_length": dataset.hop_length,
+        "win_length": dataset.win_length,
+        "n_mel_channels": dataset.n_mel_channels,
+        "target_sample_rate": dataset.target_sample_rate,
+        "resample_backend": dataset.resample_backend,
+        "num_samples": len(audio_paths),
+        "audio_md5": audio_hash.hexdigest(),
+    }
+
+
+def mel_cache_is_valid(dataset: CustomDataset, cache_dir: str, manifest: dict | None = None) -> bool:
+    # cache is complete (manifest is written last) and was built from the same mel params and audio files
+    cache_dir = Path(cache_dir)
+    if not all((cache_dir / name).exists() for name in ("mel.bin", "offsets.npy", "manifest.json")):
+        return False
+    manifest = default(manifest, _mel_cache_manifest(dataset, dataset.data["audio_path"]))
+    return json.loads((cache_dir / "manifest.json").read_text()) == manifest
+
+
+def cache_mel_memmap(
+    dataset: CustomDataset,
+    cache_dir: str,
+    mel_spec_module: MelSpec | None = None,
+    device: str | None = None,
+    num_workers: int = 8,
+    chunk_size: int = 64,
+    logger: loggerConfig = None,
+) -> str:
+    """
+    Compute the mel of every sample of a raw CustomDataset once and store them in a single float16 memmap.
+
+    cache_dir   - gets "mel.bin" with all frames (total_frames, n_mel) back to back,
+                  and "offsets.npy" (len(dataset) + 1,) so that sample i is mel.bin[offsets[i]:offsets[i + 1]]
+                  "manifest.json" (mel params + audio fingerprint) is written last and checked before reuse
+    Run offline in a single process (src/f5_tts/train/cache_mel_custom.py), training only checks the manifest.
+    mel_spec_module - copied before moving to device, the caller's module is left untouched
+    """
+    cache_dir = Path(cache_dir)
+    mel_path = cache_dir / "mel.bin"
+    offsets_path = cache_dir / "offsets.npy"
+    manifest_path = cache_dir / "manifest.json"
+
+    audio_paths = dataset.data["audio_path"]
+    manifest = _mel_cache_manifest(dataset, audio_paths)
+    if mel_cache_is_valid(dataset, cache_dir, manifest):
+        if logger:
+            logger.add_info("cache_mel_memmap", f"Reusing mel cache {cache_dir}")
+        return str(cache_dir)
+
+    if logger:
+        logger.add_info("cache_mel_memmap", f"Computing mel cache {cache_dir} for {len(dataset)} samples")
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path.unlink(missing_ok=True)  # invalidate first, so an interrupted rebuild is never reused
+
+    device = default(device, "cuda" if torch.cuda.is_available() else "cpu")
+    mel_spectrogram = (
+        copy.deepcopy(mel_spec_module)
+        if mel_spec_module is not None
+        else MelSpec(
+            n_fft=dataset.n_fft,
+            hop_length=dataset.hop_length,
+            win_length=dataset.win_length,
+            n_mel_channels=dataset.n_mel_channels,
+            target_sample_rate=dataset.target_sample_rate,
+            mel_spec_type=dataset.mel_spec_type,
+        )
+    ).to(device)
+
+    offsets = np.zeros(len(audio_paths) + 1, dtype=np.int64)
+    tmp_path = cache_dir / f"mel.bin.{os.getpid()}.tmp"
+
+    # audio decoding + resampling overlaps in threads, mel of each chunk is one padded batch on device
+    # (forward_padded keeps the valid frames identical to a per-sample mel), appended sequentially
+    with ThreadPoolExecutor(max_workers=num_workers) as executor, open(tmp_path, "wb") as f:
+        for start in tqdm(range(0, len(audio_paths), chunk_size), desc="Caching mel"):
+            audios = executor.map(dataset.load_audio, audio_paths[start : start + chunk_size])
+            wavs = [audio.squeeze(0) for audio in audios]  # '1 nw -> nw'
+            wav_lengths = torch.tensor([wav.shape[-1] for wav in wavs])
+            wav = pad_sequence(wavs, batch_first=True).to(device)
+            with torch.inference_mode():
+                mel, mel_lengths = mel_spectrogram.forward_padded(wav, wav_lengths)
+            mel = mel.transpose(1, 2).to(torch.float16).contiguous().cpu().numpy()  # 'b d t -> b t d'
+            for b, mel_len in enumerate(mel_lengths.tolist()):
+                mel[b, :mel_len].tofile(f)
+                offsets[start + b + 1] = offsets[start + b] + mel_len
+
+    tmp_path.replace(mel_path)
+    np.save(offsets_path, offsets)
+    manifest_path.write_text(json.dumps(manifest, indent=2))
+
+    return str(cache_dir)
+
 
 def load_multiple_phonemize_datasets(
     root_paths: list[str],
@@ -416,10 +624,17 @@ def load_multiple_phonemize_datasets(
     mel_spec_kwargs: dict = dict(),
     logger: loggerConfig = None,
     vocab_map: dict = None,
+    mel_cache_dir: str | None = None,
+    build_mel_cache: bool = False,
+    resample_backend: str = "torchaudio",
 ) -> CustomDataset:
     """
     dataset_type    - "CustomDataset" if you want to use tokenizer name and default data path to load for train_dataset
                     - "CustomDatasetPath" if you just want to pass the full path to a preprocessed dataset without relying on tokenizer
+    mel_cache_dir   - if given, mels are read back from a memmap per metadata file under this dir
+    build_mel_cache - build missing / stale caches (offline step), otherwise a missing / stale cache is an error,
+                      so that training ranks never wait on hours of mel computation
+    resample_backend - "torchaudio" (default) or "julius", see get_resampler
     """
 
     print("Loading dataset ...")
@@ -440,9 +655,28 @@ def load_multiple_phonemize_datasets(
             hf_dataset,
             durations=None,
             preprocessed_mel=False,
-            mel_spec_module=mel_spec_module,
+            resample_backend=resample_backend,
             **mel_spec_kwargs,
         )
+
+        if mel_cache_dir is not None:
+            # same meta file names are common across corpora, so key the cache by the full path
+            meta_hash = hashlib.md5(str(meta_file.resolve()).encode()).hexdigest()[:8]
+            cache_dir = Path(mel_cache_dir) / f"{meta_file.stem}_{meta_hash}"
+            if build_mel_cache:
+                cache_mel_memmap(custom_dataset, cache_dir, mel_spec_module=mel_spec_module, logger=logger)
+            elif not mel_cache_is_valid(custom_dataset, cache_dir):
+                raise FileNotFoundError(
+                    f"Mel cache {cache_dir} for {meta_file} is missing or stale, "
+                    "build it first with `python src/f5_tts/train/cache_mel_custom.py`"
+                )
+            custom_dataset = CustomDataset(
+                hf_dataset,
+                durations=None,
+                mel_cache_dir=str(cache_dir),
+                resample_backend=resample_backend,
+                **mel_spec_kwargs,
+            )
         datasets.append(custom_dataset)
 
     return CustomConcatDataset(datasets)
@@ -451,25 +685,41 @@ def load_multiple_phonemize_datasets(
 # collation
 
 
+def collate_text(batch):
+    if "text_ids" in batch[0]:
+        # already tokenized, padded with -1 as list_str_to_idx does; raw strings kept for sample logging
+        text_ids = [torch.as_tensor(item["text_ids"], dtype=torch.long) for item in batch]
+        text_lengths = torch.LongTensor([ids.shape[0] for ids in text_ids])
+        text = pad_sequence(text_ids, batch_first=True, padding_value=-1)
+        return dict(text=text, text_lengths=text_lengths, raw_text=[item["text"] for item in batch])
+
+    text = [item["text"] for item in batch]
+    text_lengths = torch.LongTensor([len(item) for item in text])
+    return dict(text=text, text_lengths=text_lengths)
+
+
 def collate_fn(batch):
-    mel_specs = [item["mel_spec"].squeeze(0) for item in batch]
-    mel_lengths = torch.LongTensor([spec.shape[-1] for spec in mel_specs])
-    max_mel_length = mel_lengths.amax()
+    if "wav" in batch[0]:
+        # raw waves are only padded here, the trainer turns them into mel in one batched call on device
+        wavs = [item["wav"] for item in batch]
+        wav_lengths = torch.LongTensor([wav.shape[-1] for wav in wavs])
+        wavs = pad_sequence(wavs, batch_first=True, padding_value=0.0)
 
-    padded_mel_specs = []
-    for spec in mel_specs:  # TODO. maybe records mask for attention here
-        padding = (0, max_mel_length - spec.size(-1))
-        padded_spec = F.pad(spec, padding, value=0)
-        padded_mel_specs.append(padded_spec)
+        return dict(
+            wav=wavs,
+            wav_lengths=wav_lengths,
+            **collate_text(batch),
+        )
 
-    mel_specs = torch.stack(padded_mel_specs)
+    mel_specs = [item["mel_spec"].squeeze(0) for item in batch]
+    mel_lengths = torch.LongTensor([spec.shape[-1] for spec in mel_specs])
 
-    text = [item["text"] for item in batch]
-    text_lengths = torch.LongTensor([len(item) for item in text])
+    # TODO. maybe records mask for attention here
+    mel_specs = pad_sequence([spec.T for spec in mel_specs], batch_first=True, padding_value=0.0)  # 'b n d'
+    mel_specs = mel_specs.transpose(1, 2).contiguous()  # 'b n d -> b d n'
 
     return dict(
         mel=mel_specs,
         mel_lengths=mel_lengths,
-        text=text,
-        text_lengths=text_lengths,
+        **collate_text(batch),
     )
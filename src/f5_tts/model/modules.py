@@ -119,6 +119,7 @@ class MelSpec(nn.Module):
         self.win_length = win_length
         self.n_mel_channels = n_mel_channels
         self.target_sample_rate = target_sample_rate
+        self.mel_spec_type = mel_spec_type
 
         if mel_spec_type == "vocos":
             self.extractor = get_vocos_mel_spectrogram
@@ -142,6 +143,26 @@ class MelSpec(nn.Module):
 
         return mel
 
+    def frame_lengths(self, wav_lengths):
+        # number of mel frames each (unpadded) wave of a batch yields
+        if self.mel_spec_type == "vocos":  # centered stft
+            return wav_lengths // self.hop_length + 1
+        padding = (self.n_fft - self.hop_length) // 2
+        return (wav_lengths + 2 * padding - self.n_fft) // self.hop_length + 1
+
+    def forward_padded(self, wav, wav_lengths):
+        # mel of a zero padded batch 'b nw -> b d n', with the same valid frames as forward on each wave alone:
+        # the extractor reflect-pads at the wave end, so fill each wave's tail padding with its own reflection
+        padding = self.n_fft // 2 if self.mel_spec_type == "vocos" else (self.n_fft - self.hop_length) // 2
+        wav = F.pad(wav, (0, padding))
+        wav_lengths = wav_lengths.to(wav.device).unsqueeze(1)
+        offsets = torch.arange(padding, device=wav.device)
+        reflected = wav.gather(1, (wav_lengths - 2 - offsets).clamp(min=0))
+        wav = wav.scatter(1, wav_lengths + offsets, reflected)
+
+        mel_lengths = self.frame_lengths(wav_lengths.squeeze(1))
+        return self(wav)[..., : mel_lengths.max()], mel_lengths
+
 
 # sinusoidal position embedding
 
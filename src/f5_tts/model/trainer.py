@@ -17,7 +17,7 @@ from tqdm import tqdm
 
 from f5_tts.model import CFM
 from f5_tts.model.dataset import DynamicBatchSampler, collate_fn
-from f5_tts.model.utils import default, exists
+from f5_tts.model.utils import default, exists, lens_to_mask
 
 # trainer
 
@@ -143,6 +143,16 @@ class Trainer:
     def is_main(self):
         return self.accelerator.is_main_process
 
+    @torch.no_grad()
+    def wav_to_mel(self, wav, wav_lengths):
+        # one batched mel on device for the whole batch, instead of one per sample in dataloader workers
+        # valid frames match the per-sample / cached mels, the tail stft windows see each wave's own reflect padding
+        mel_spec = self.accelerator.unwrap_model(self.model).mel_spec
+        mel, mel_lengths = mel_spec.forward_padded(wav, wav_lengths)  # 'b nw -> b d n'
+        # zero the frames past each wave's length, same as collate_fn does for precomputed mel
+        mel = mel.masked_fill(~lens_to_mask(mel_lengths, length=mel.shape[-1]).unsqueeze(1), 0.0)
+        return mel, mel_lengths
+
     def save_checkpoint(self, update, last=False):
         self.accelerator.wait_for_everyone()
         if self.is_main:
@@ -357,6 +367,9 @@ class Trainer:
             )
 
             for batch in current_dataloader:
+                if "wav" in batch:
+                    batch["mel"], batch["mel_lengths"] = self.wav_to_mel(batch["wav"], batch["wav_lengths"])
+
                 with self.accelerator.accumulate(self.model):
                     text_inputs = batch["text"]
                     mel_spec = batch["mel"].permute(0, 2, 1)
@@ -8,7 +8,7 @@ import torch
 import torchaudio
 import wandb
 from accelerate import Accelerator
-from accelerate.utils import DistributedDataParallelKwargs
+from accelerate.utils import DataLoaderConfiguration, DistributedDataParallelKwargs
 from ema_pytorch import EMA
 from torch.optim import AdamW
 from torch.optim.lr_scheduler import LinearLR, SequentialLR
@@ -17,9 +17,55 @@ from tqdm import tqdm
 
 from f5_tts.model import CFM
 from f5_tts.model.dataset import DynamicBatchSampler, collate_fn
-from f5_tts.model.utils import default, exists
+from f5_tts.model.utils import default, exists, lens_to_mask
 from f5_tts.logger import loggerConfig, send_telegram_message
 
+# cuda prefetcher
+
+
+class CUDAPrefetcher:
+    """
+    Wraps a (prepared) dataloader so that the next batch is fetched and copied to device on a side CUDA stream
+    while the current step runs on the default stream. Falls back to plain iteration off CUDA.
+    """
+
+    def __init__(self, loader, device):
+        self.loader = loader
+        self.device = torch.device(device)
+
+    def __len__(self):
+        return len(self.loader)
+
+    def _to_device(self, batch):
+        return {k: v.to(self.device, non_blocking=True) if torch.is_tensor(v) else v for k, v in batch.items()}
+
+    def __iter__(self):
+        if self.device.type != "cuda":
+            yield from self.loader
+            return
+
+        stream = torch.cuda.Stream(device=self.device)
+        loader = iter(self.loader)
+
+        def preload():
+            with torch.cuda.stream(stream):
+                try:
+                    return self._to_device(next(loader))
+                except StopIteration:
+                    return None
+
+        batch = preload()
+        while batch is not None:
+            current_stream = torch.cuda.current_stream(self.device)
+            current_stream.wait_stream(stream)
+            for v in batch.values():
+                if torch.is_tensor(v):
+                    v.record_stream(current_stream)  # memory was allocated on the side stream
+            next_batch = preload()
+            yield batch
+            batch = next_batch
+
+
 # trainer
 
 
@@ -60,6 +106,9 @@ class TrainerCustom:
             logger = None
         self.log_samples = log_samples
 
+        # batches come from pinned memory, so the host to device copy of prepared dataloaders can be async
+        accelerate_kwargs = {"dataloader_config": DataLoaderConfiguration(non_blocking=True), **accelerate_kwargs}
+
         self.accelerator = Accelerator(
             log_with=logger if logger == "wandb" else None,
             kwargs_handlers=[ddp_kwargs],
@@ -144,6 +193,16 @@ class TrainerCustom:
     def is_main(self):
         return self.accelerator.is_main_process
 
+    @torch.no_grad()
+    def wav_to_mel(self, wav, wav_lengths):
+        # one batched mel on device for the whole batch, instead of one per sample in dataloader workers
+        # valid frames match the per-sample / cached mels, the tail stft windows see each wave's own reflect padding
+        mel_spec = self.accelerator.unwrap_model(self.model).mel_spec
+        mel, mel_lengths = mel_spec.forward_padded(wav, wav_lengths)  # 'b nw -> b d n'
+        # zero the frames past each wave's length, same as collate_fn does for precomputed mel
+        mel = mel.masked_fill(~lens_to_mask(mel_lengths, length=mel.shape[-1]).unsqueeze(1), 0.0)
+        return mel, mel_lengths
+
     def save_checkpoint(self, update, last=False):
         self.accelerator.wait_for_everyone()
         if self.is_main:
@@ -261,7 +320,8 @@ class TrainerCustom:
         return update
 
     def train(self, train_dataset:Dataset, num_workers:int=16, resumable_with_seed:int=None, 
-              logger:loggerConfig=None, epoch_print_step:int=1): # valid_dataset: Dataset=None, 
+              logger:loggerConfig=None, epoch_print_step:int=1, pin_memory:bool=True,
+              persistent_workers:bool=True, prefetch_factor:int=4, cuda_prefetch:bool=True): # valid_dataset: Dataset=None, 
         if self.log_samples:
             from f5_tts.infer.utils_infer import cfg_strength, load_vocoder, nfe_step, sway_sampling_coef
 
@@ -278,13 +338,18 @@ class TrainerCustom:
         else:
             generator = None
 
+        # workers keep prefetch_factor batches in flight; both options are only valid with worker processes
+        persistent_workers = persistent_workers and num_workers > 0
+        prefetch_factor = prefetch_factor if num_workers > 0 else None
+
         if self.batch_size_type == "sample":
             train_dataloader = DataLoader(
                 train_dataset,
                 collate_fn=collate_fn,
                 num_workers=num_workers,
-                pin_memory=True,
-                persistent_workers=True,
+                pin_memory=pin_memory,
+                persistent_workers=persistent_workers,
+                prefetch_factor=prefetch_factor,
                 batch_size=self.batch_size_per_gpu,
                 shuffle=True,
                 generator=generator,
@@ -304,8 +369,9 @@ class TrainerCustom:
                 train_dataset,
                 collate_fn=collate_fn,
                 num_workers=num_workers,
-                pin_memory=True,
-                persistent_workers=True,
+                pin_memory=pin_memory,
+                persistent_workers=persistent_workers,
+                prefetch_factor=prefetch_factor,
                 batch_sampler=batch_sampler,
             )
             # if valid_dataset is not None:
@@ -342,6 +408,10 @@ class TrainerCustom:
         start_update = self.load_checkpoint()
         global_update = start_update
 
+        # the prefetcher reaches the end of the dataloader one batch early, which would shift
+        # accelerate's end-of-dataloader gradient sync, so only overlap copies without accumulation
+        cuda_prefetch = cuda_prefetch and self.grad_accumulation_steps == 1
+
         if exists(resumable_with_seed):
             orig_epoch_step = len(train_dataloader)
             start_step = start_update * self.grad_accumulation_steps
@@ -374,10 +444,17 @@ class TrainerCustom:
                 mininterval=epoch_print_step,
             )
 
+            if cuda_prefetch:
+                current_dataloader = CUDAPrefetcher(current_dataloader, self.accelerator.device)
+
             for idx, batch in enumerate(current_dataloader):
+                text_inputs = batch["text"]  # before try, the except handler logs it even if the mel step fails
                 try:
+                    if "wav" in batch:
+                        batch["mel"], batch["mel_lengths"] = self.wav_to_mel(batch["wav"], batch["wav_lengths"])
+                    batch["mel"] = batch["mel"].float()  # cached mels arrive as float16, no-op otherwise
+
                     with self.accelerator.accumulate(self.model):
-                        text_inputs = batch["text"]
                         # print(text_inputs)
                         mel_spec = batch["mel"].permute(0, 2, 1)
                         mel_lengths = batch["mel_lengths"]
@@ -427,8 +504,9 @@ class TrainerCustom:
                         if self.log_samples and self.accelerator.is_local_main_process:
                             send_telegram_message("7567748971:AAGXH1d_eXdM7_9uAwEjoFVn5XWRqzkEmNU", "409968104", f"{log_message}")
                             ref_audio_len = mel_lengths[0]
+                            raw_text = batch.get("raw_text", text_inputs)  # text_inputs are ids if pre-tokenized
                             infer_text = [
-                                text_inputs[0] + ([" "] if isinstance(text_inputs[0], list) else " ") + text_inputs[0]
+                                raw_text[0] + ([" "] if isinstance(raw_text[0], list) else " ") + raw_text[0]
                             ]
                             print(infer_text)
                             with torch.inference_mode():
@@ -462,7 +540,7 @@ class TrainerCustom:
                             self.writer.add_audio(
                                 f"Sample/update_{global_update}_Reference", ref_audio, global_step=global_update, sample_rate=target_sample_rate
                             )
-                            update_text = text_inputs[0] if isinstance(text_inputs[0], str) else " ".join(map(str, text_inputs[0]))
+                            update_text = raw_text[0] if isinstance(raw_text[0], str) else " ".join(map(str, raw_text[0]))
                             self.writer.add_text(
                                 f"Sample/update_{global_update}_Text", update_text, global_step=global_update
                             )
@@ -0,0 +1,39 @@
+# mel cache script, run once (single process) before `accelerate launch src/f5_tts/train/train_custom.py`
+# when datasets.mel_cache_dir is set, training only checks the caches built here.
+
+import os
+from pathlib import Path
+
+from omegaconf import OmegaConf
+
+from f5_tts.model.dataset import load_multiple_phonemize_datasets
+from f5_tts.model.utils import get_tokenizer
+from f5_tts.logger import loggerConfig
+
+project_root = Path(__file__).resolve().parents[3]
+os.chdir(project_root)  # change working directory to root of project (local editable)
+print(f"[INFO] Changed working directory to {project_root}")
+
+config_path = Path("train/f5tts_zzal_v2/f5tts_zzal_v2.yaml")
+model_cfg = OmegaConf.load(config_path)
+
+
+def main(model_cfg):
+    logger = loggerConfig(logger_name="f5tts_cache_mel", log_dir=model_cfg.ckpts.save_dir, log_type='file', is_print=True)
+
+    mel_cache_dir = model_cfg.datasets.get("mel_cache_dir", None)
+    if mel_cache_dir is None:
+        raise ValueError(f"datasets.mel_cache_dir is not set in {config_path}")
+
+    vocab_char_map, _ = get_tokenizer(model_cfg.model.tokenizer_path, model_cfg.model.tokenizer)
+    load_multiple_phonemize_datasets(model_cfg.datasets.train_paths, model_cfg.datasets.train_metadatas,
+                                     mel_spec_kwargs=model_cfg.model.mel_spec, logger=logger, vocab_map=vocab_char_map,
+                                     mel_cache_dir=mel_cache_dir, build_mel_cache=True,
+                                     resample_backend=model_cfg.datasets.get("resample_backend", "torchaudio"))
+    logger.add_info('Mel cache', f'Mel caches ready under {mel_cache_dir}')
+
+
+if __name__ == "__main__":
+    main(model_cfg)
+
+# python src/f5_tts/train/cache_mel_custom.py
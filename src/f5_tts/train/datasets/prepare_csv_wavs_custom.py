@@ -227,8 +227,8 @@ def save_prepped_dataset(out_dir, result, duration_list, text_vocab_set, is_fine
         shutil.copy2(file_vocab_finetune, voca_out_path)
     else:
         with open(voca_out_path.as_posix(), "w") as f:
-            for vocab in sorted(text_vocab_set):
-                f.write(vocab + "\n")
+            if text_vocab_set:
+                f.write("\n".join(sorted(text_vocab_set)) + "\n")  # one write for the whole vocab
 
     dataset_name = out_dir.stem
     print(f"\nFor {dataset_name}, sample count: {len(result)}")
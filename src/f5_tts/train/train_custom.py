@@ -85,7 +85,9 @@ def main(model_cfg):
 
 
     train_dataset = load_multiple_phonemize_datasets(model_cfg.datasets.train_paths, model_cfg.datasets.train_metadatas,
-                                                     mel_spec_kwargs=model_cfg.model.mel_spec, logger=logger, vocab_map=vocab_char_map)
+                                                     mel_spec_kwargs=model_cfg.model.mel_spec, logger=logger, vocab_map=vocab_char_map,
+                                                     mel_cache_dir=model_cfg.datasets.get("mel_cache_dir", None),
+                                                     resample_backend=model_cfg.datasets.get("resample_backend", "torchaudio"))
     
     # valid_dataset = load_multiple_phonemize_datasets(model_cfg.datasets.valid_paths, model_cfg.datasets.valid_metadatas,
     #                                                  tokenizer, mel_spec_kwargs=model_cfg.model.mel_spec)
@@ -1,11 +1,23 @@
+import functools
 import json
+import os
+import re
+import shutil
 import torchaudio
 
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from typing import Dict, Set, Tuple
 
 from src.f5_tts.model.utils import get_tokenizer
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# 각 줄의 두 번째 필드(텍스트)를 지운 나머지 → 텍스트 외 필드(파일명, 화자, 언어 등)에 fix 대상 문자가 있는지 검사용
+_TRANSCRIPT_RE = re.compile(r"^([^|\n]*\|)[^|\n]*", re.MULTILINE)
 # 기본 심볼 정의
 _letters = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz'
 _letters_ipa = "ɑɐɒæɓʙβɔɕçɗɖðʤəɘɚɛɜɝɞɟʄɡɠɢʛɦɧħɥʜɨɪʝɭɬɫɮʟɱɯɰŋɳɲɴøɵɸθœɶʘɹɺɾɻʀʁɽʂʃʈʧʉʊʋⱱʌɣɤʍχʎʏʑʐʒʔʡʕʢǀǁǂǃˈˌːˑʼʴʰʱᵝʲʷˠˤ˞↓↑→↗↘\'̩ᵻ"
@@ -18,85 +30,199 @@ _special_symbols = (
     '#%&*+=>@\\/'  # 원본 vocab에서 발견된 추가 특수기호 포함
 )
 
-symbols = [' '] + list(_punctuation) + list(_letters) + list(_letters_ipa) + list(_ipa_jp)
+symbols = [' ', *_punctuation, *_letters, *_letters_ipa, *_ipa_jp]
+# ' 와 ᵝ 가 여러 그룹에 중복되므로 순서를 유지한 채 중복 제거
+symbols = list(dict.fromkeys(symbols))
 
 
 # 모든 문자 통합 후 중복 제거
-# symbol_set = set()
-# symbol_set.update(_special_symbols)
-# symbol_set.update(_letters)
-# symbol_set.update(_letters_ipa)
-# symbol_set.update(_ipa_jp)
+# symbol_set = frozenset(_special_symbols).union(_letters, _letters_ipa, _ipa_jp)
 
 # 정렬 (가독성과 일관성을 위해)
 # symbols += sorted(symbol_set)
 
-def vocab_checker(vocab_path:str, meta_path:str, fixes_path:str):
-    vocab_map, _ = get_tokenizer(vocab_path, 'char')    
-    unknown_chars: Set[str] = set()
-    with open(meta_path, "r", encoding="utf-8", errors="ignore") as f:
+@functools.lru_cache(maxsize=8)
+def _load_vocab(vocab_path:str, mtime:float):
+    vocab_map, _ = get_tokenizer(vocab_path, 'char')
+    return vocab_map, frozenset(vocab_map)
+
+def load_vocab(vocab_path:str):
+    # 여러 meta 파일을 검사할 때 vocab.txt 를 매번 다시 파싱하지 않도록 캐시 (파일이 바뀌면 mtime 으로 무효화)
+    return _load_vocab(vocab_path, os.path.getmtime(vocab_path))
+
+def vocab_checker(vocab_path:str, meta_path:str, fixes_path:str, clean:bool=True):
+    # clean=True: meta 가 올바른 UTF-8 이라고 가정하고 strict 로 디코딩 (깨진 바이트가 있으면 UnicodeDecodeError)
+    # clean=False: 깨진 바이트는 무시 (기존 동작)
+    errors = "strict" if clean else "ignore"
+    vocab_map, vocab_keys = load_vocab(vocab_path)
+    seen_chars: Set[str] = set()  # 등장한 모든 문자, 미등록 문자는 마지막에 한 번만 차집합으로 계산
+    seen_texts: Set[int] = set()  # 이미 검사한 문장의 해시, 중복 문장은 새 문자를 추가하지 않으므로 건너뜀
+    # 바이너리로 읽고 두 번째 필드(텍스트)만 디코딩
+    with open(meta_path, "rb", buffering=1 << 20) as f:
         for line in f:
-            line = line.strip()
-            if "|" not in line:
+            pipe = line.find(b"|")
+            if pipe < 0:
                 continue
-            try:
-                _, text, *_ = line.split("|", 4)
-            except ValueError:
+            end = line.find(b"|", pipe + 1)
+            raw = line[pipe + 1:] if end < 0 else line[pipe + 1:end]
+
+            h = hash(raw)
+            if h in seen_texts:
                 continue
-            unknown_chars.update(ch for ch in text if ch not in vocab_map)
+            seen_texts.add(h)
+
+            text = raw.decode("utf-8", errors)
+            seen_chars.update(text.rstrip() if end < 0 else text)  # 원본의 line.strip() 은 줄 끝만 텍스트에 영향
+    unknown_chars = seen_chars - vocab_keys
 
     # 2) 딕셔너리 → JSON 저장
     err_dict = {ch: None for ch in sorted(unknown_chars)}
-    with open(fixes_path, "w", encoding="utf-8") as jf:
-        json.dump(err_dict, jf, ensure_ascii=False, indent=2)
+    if orjson is not None:  # C 구현, 결과는 json.dump(ensure_ascii=False, indent=2) 와 동일
+        with open(fixes_path, "wb") as jf:
+            jf.write(orjson.dumps(err_dict, option=orjson.OPT_INDENT_2))
+    else:
+        with open(fixes_path, "w", encoding="utf-8") as jf:
+            json.dump(err_dict, jf, ensure_ascii=False, indent=2)
 
     print(f"[INFO] {len(err_dict)} unknown chars saved to {fixes_path}")
     return vocab_map, fixes_path
 
-def vocab_changer(meta_path:str, json_path:str, output_meta:str|None=None, backup:bool=True):
+def _split_line_ranges(path:str, num_parts:int):
+    # 파일을 num_parts 개의 바이트 구간으로 나누되, 경계는 항상 줄 시작에 맞춤
+    size = os.path.getsize(path)
+    bounds = [0]
+    with open(path, "rb") as f:
+        for i in range(1, num_parts):
+            f.seek(max(i * size // num_parts, bounds[-1]))
+            f.readline()
+            bounds.append(f.tell())
+    bounds.append(size)
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if end > start]
+
+def _translate_range(src_path:str, start:int, end:int, table:dict, fix_set:frozenset, out_path:str,
+                     errors:str="strict"):
+    # src_path[start:end] 구간을 translate 해서 out_path 에 저장, (changed, untouched) 반환
+    # 텍스트 외 필드에 fix 대상 문자가 있으면 (예: x1.wav 의 '1') 전체 translate 가 파일명을 바꾸므로 None 반환
+    with open(src_path, "rb") as f:
+        f.seek(start)
+        buf = f.read(end - start).decode("utf-8", errors)
+    buf = buf.replace("\r\n", "\n").replace("\r", "\n")  # 텍스트 모드 읽기와 같은 universal newline
+    if not fix_set.isdisjoint(_TRANSCRIPT_RE.sub(r"\1", buf)):
+        return None
+    new_buf = buf.translate(table)
+    if new_buf and not new_buf.endswith("\n"):
+        new_buf += "\n"
+
+    # 원본처럼 \n 으로만 줄을 나눔 (splitlines 는 \u2028, \x85, \f 등에서도 나눔), 끝의 빈 원소는 제외
+    old_lines, new_lines = buf.split("\n"), new_buf.split("\n")
+    if old_lines[-1] == "":
+        old_lines.pop()
+    if new_lines[-1] == "":
+        new_lines.pop()
+    changed = sum(1 for a, b in zip(old_lines, new_lines) if a != b)
+    untouched = sum(1 for a in old_lines if "|" in a) - changed
+
+    Path(out_path).write_text(new_buf, encoding="utf-8")
+    return changed, untouched
+
+def vocab_changer(meta_path:str, json_path:str, output_meta:str|None=None, backup:bool=True, num_workers:int=1,
+                  clean:bool=True):
+    # clean 의 의미는 vocab_checker 와 동일 (True: strict UTF-8, False: 깨진 바이트 무시)
+    errors = "strict" if clean else "ignore"
     with open(json_path, "r", encoding="utf-8") as jf:
         fix_map: Dict[str, str | None] = json.load(jf)
 
     # 1) 출력 경로 결정
     output_meta = output_meta or f"{meta_path}.fixed"
 
-    # 2) 백업
+    # 2) 백업 (원본은 옮기지 않고 복사만, 변환은 항상 원본에서 읽음)
+    src_path = meta_path
     if backup:
-        bak_path = f"{meta_path}.bak"
-        Path(meta_path).replace(bak_path)
-        src_path = bak_path     # 백업본을 읽어 변환
+        shutil.copyfile(meta_path, f"{meta_path}.bak")
+
+    # 3) 변환 수행 (None 값은 원문 유지 → 테이블에서 제외)
+    #    임시 파일에 쓴 뒤 os.replace 로 교체 → output_meta == meta_path 여도 안전, 중간에 죽어도 원본 보존
+    fix = {k: v for k, v in fix_map.items() if v is not None}
+    fix_set = frozenset(fix)
+    if all(len(v) == 1 for v in fix.values()):  # 전부 1:1 치환이면 int→int 테이블 (translate 의 가장 빠른 경로)
+        table = {ord(k): ord(v) for k, v in fix.items()}
     else:
-        src_path = meta_path
-
-    # 3) 변환 수행
+        table = str.maketrans(fix)
     changed, untouched = 0, 0
-    with open(src_path, "r", encoding="utf-8", errors="ignore") as fin, \
-         open(output_meta, "w", encoding="utf-8") as fout:
-
-        for line in fin:
-            line = line.rstrip("\n")
-            if "|" not in line:
-                fout.write(line + "\n")
-                continue
-
-            parts = line.split("|", 4)
-            if len(parts) < 2:
-                fout.write(line + "\n")
-                continue
-
-            text = parts[1]
-            new_text = "".join(
-                fix_map.get(ch, ch) if fix_map.get(ch) is not None else ch
-                for ch in text
-            )
-
-            if text != new_text:
-                changed += 1
-            else:
-                untouched += 1
-
-            parts[1] = new_text
-            fout.write("|".join(parts) + "\n")
+    tmp_path = f"{output_meta}.tmp"
+
+    # 구분자('|', 개행)를 바꾸지 않고 텍스트 외 필드에 fix 대상 문자가 없으면 파일 전체를 한 번에 translate
+    # num_workers > 1 이면 줄 경계로 나눈 구간을 프로세스별로 변환 후 순서대로 이어붙임
+    # 한 구간이라도 텍스트 외 필드에 fix 대상 문자가 있으면 아래의 줄 단위 경로로 처리
+    fast_done = False
+    if fix.keys().isdisjoint("|\r\n"):
+        ranges = _split_line_ranges(src_path, num_workers)
+        if len(ranges) <= 1:
+            part_paths = [tmp_path]
+            results = [_translate_range(src_path, 0, os.path.getsize(src_path), table, fix_set, tmp_path, errors)]
+        else:
+            part_paths = [f"{output_meta}.part{i}" for i in range(len(ranges))]
+            with ProcessPoolExecutor(max_workers=num_workers) as executor:
+                futures = [
+                    executor.submit(_translate_range, src_path, start, end, table, fix_set, part_path, errors)
+                    for (start, end), part_path in zip(ranges, part_paths)
+                ]
+                results = [future.result() for future in futures]
+
+        fast_done = all(result is not None for result in results)
+        if fast_done:
+            changed = sum(result[0] for result in results)
+            untouched = sum(result[1] for result in results)
+            if len(part_paths) > 1:
+                with open(tmp_path, "wb") as fout:
+                    for part_path in part_paths:
+                        with open(part_path, "rb") as fpart:
+                            shutil.copyfileobj(fpart, fout)
+                        os.remove(part_path)
+        else:
+            for part_path in part_paths:
+                if os.path.exists(part_path):
+                    os.remove(part_path)
+
+    if not fast_done:
+        # 바이너리로 읽고 두 번째 필드(텍스트)만 디코딩/변환, 나머지 필드는 바이트 그대로 기록
+        with open(src_path, "rb", buffering=1 << 20) as fin, \
+             open(tmp_path, "wb") as fout:
+
+            # 줄마다 write 하지 않고 64KiB 단위로 모아서 기록
+            out_chunks = []
+            out_len = 0
+            # 루프 안에서 매번 속성 조회하지 않도록 로컬로 바인딩
+            _write, _append, _clear = fout.write, out_chunks.append, out_chunks.clear
+            _find, _isdisjoint = bytes.find, fix_set.isdisjoint
+            for line in fin:
+                line = line.rstrip(b"\r\n") + b"\n"  # 전체 translate 경로 / 원본처럼 줄 끝은 항상 \n
+                pipe = _find(line, b"|")
+                if pipe >= 0:
+                    end = _find(line, b"|", pipe + 1)
+                    if end < 0:
+                        end = len(line) - 1  # 텍스트가 마지막 필드
+
+                    text = line[pipe + 1:end].decode("utf-8", errors)
+                    # 대부분의 줄은 바꿀 문자가 없음 → 원본 그대로
+                    new_text = text if _isdisjoint(text) else text.translate(table)
+                    if text == new_text:  # 바뀐 게 없으면 재조립 없이 원본 줄 그대로
+                        untouched += 1
+                    else:
+                        changed += 1
+                        line = line[:pipe + 1] + new_text.encode("utf-8") + line[end:]
+
+                _append(line)
+                out_len += len(line)
+                if out_len >= 1 << 16:
+                    _write(b"".join(out_chunks))
+                    _clear()
+                    out_len = 0
+
+            if out_chunks:
+                _write(b"".join(out_chunks))
+
+    os.replace(tmp_path, output_meta)
 
     print(f"[INFO] Lines changed: {changed}, untouched: {untouched}")
-    print(f"[INFO] Fixed meta saved to: {output_meta}")
\ No newline at end of file
+    print(f"[INFO] Fixed meta saved to: {output_meta}")